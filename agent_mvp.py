@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 """
-TripPlanner — MVP Agent (single-file, no deps)
+TripPlanner — MVP Agent (no deps)
 - Interactive CLI agent (Q&A) che costruisce un mini itinerario realistico
 - Genera un file .ics e stampa i link "Aggiungi a Google Calendar" per ogni evento
 - Nessuna dipendenza esterna: solo Python standard library
+- Calendario .ics e link Google Calendar condivisi in tripplanner/ics.py
 
 Uso:
   python agent_mvp.py
@@ -15,141 +16,28 @@ Note:
 """
 from __future__ import annotations
 from datetime import datetime, date, time, timedelta
-from dataclasses import dataclass
 from typing import List, Optional
-import urllib.parse as _url
-import uuid
-
-# ==========================
-# Calendar (.ics) utilities
-# ==========================
-TZID = "Europe/Rome"
-
-
-def _escape_ics(text: Optional[str]) -> str:
-    if not text:
-        return ""
-    return (
-        text.replace("\\", "\\\\")
-        .replace(";", "\\;")
-        .replace(",", "\\,")
-        .replace("\n", "\\n")
-    )
-
-
-def _fmt_dt_local(dt: datetime) -> str:
-    # local naive datetime → basic format
-    return dt.strftime("%Y%m%dT%H%M%S")
-
-
-VTIMEZONE_EUROPE_ROME = "\r\n".join(
-    [
-        "BEGIN:VTIMEZONE",
-        "TZID:Europe/Rome",
-        "X-LIC-LOCATION:Europe/Rome",
-        "BEGIN:DAYLIGHT",
-        "TZOFFSETFROM:+0100",
-        "TZOFFSETTO:+0200",
-        "TZNAME:CEST",
-        "DTSTART:19700329T020000",
-        "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
-        "END:DAYLIGHT",
-        "BEGIN:STANDARD",
-        "TZOFFSETFROM:+0200",
-        "TZOFFSETTO:+0100",
-        "TZNAME:CET",
-        "DTSTART:19701025T030000",
-        "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
-        "END:STANDARD",
-        "END:VTIMEZONE",
-    ]
-)
-
-
-def make_ics(trip_title: str, events: List["Event"], add_alarm_minutes: int = 30) -> str:
-    now_utc = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    header = [
-        "BEGIN:VCALENDAR",
-        "PRODID:-//TripPlanner AI//MVP//IT",
-        "VERSION:2.0",
-        "CALSCALE:GREGORIAN",
-        "METHOD:PUBLISH",
-        f"X-WR-CALNAME:{_escape_ics(trip_title)}",
-        f"X-WR-TIMEZONE:{TZID}",
-        VTIMEZONE_EUROPE_ROME,
-    ]
-
-    body_lines = []
-    for e in events:
-        uid = f"{uuid.uuid4()}@tripplanner.mvp"
-        body = [
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{now_utc}",
-            f"DTSTART;TZID={TZID}:{_fmt_dt_local(e.start)}",
-            f"DTEND;TZID={TZID}:{_fmt_dt_local(e.end)}",
-            f"SUMMARY:{_escape_ics(e.title)}",
-        ]
-        if e.location:
-            body.append(f"LOCATION:{_escape_ics(e.location)}")
-        desc_parts = []
-        if e.notes:
-            desc_parts.append(e.notes)
-        if e.url:
-            desc_parts.append(f"Link: {e.url}")
-        if desc_parts:
-            body.append(f"DESCRIPTION:{_escape_ics('\n'.join(desc_parts))}")
-        if add_alarm_minutes and add_alarm_minutes > 0:
-            body += [
-                "BEGIN:VALARM",
-                f"TRIGGER:-PT{int(add_alarm_minutes)}M",
-                "ACTION:DISPLAY",
-                "DESCRIPTION:Promemoria",
-                "END:VALARM",
-            ]
-        body.append("END:VEVENT")
-        body_lines += body
-
-    footer = ["END:VCALENDAR"]
-    ics = "\r\n".join(header + body_lines + footer) + "\r\n"
-    return ics
-
-
-# ==========================
-# Google Calendar link utils
-# ==========================
-
-def gcal_link(e: "Event") -> str:
-    base = "https://calendar.google.com/calendar/render?action=TEMPLATE"
-    q = {
-        "text": e.title,
-        "dates": f"{e.start.strftime('%Y%m%dT%H%M%S')}/{e.end.strftime('%Y%m%dT%H%M%S')}",
-        "details": e.notes or "",
-        "location": e.location or "",
-    }
-    return base + "&" + _url.urlencode(q)
+import re
+import sys
 
+from tripplanner.ics import Event, gcal_link, iter_ics_lines
 
 # ==========================
 # Minimal planner (rule-based)
 # ==========================
 
-@dataclass
-class Event:
-    title: str
-    start: datetime
-    end: datetime
-    location: Optional[str] = None
-    url: Optional[str] = None
-    notes: Optional[str] = None
-
-
 SLOTS = [
     (time(9, 0), time(12, 30), "Mattina"),
     (time(14, 30), time(18, 0), "Pomeriggio"),
     (time(20, 0), time(22, 0), "Sera"),
 ]
 
+# Offset degli slot dalla mezzanotte: un solo datetime per giorno, poi somme di timedelta
+SLOT_DELTAS = [
+    (timedelta(hours=t0.hour, minutes=t0.minute), timedelta(hours=t1.hour, minutes=t1.minute), label)
+    for t0, t1, label in SLOTS
+]
+
 
 INTEREST_TEMPLATES = {
     "arte": ["Museo principale", "Centro storico", "Galleria locale"],
@@ -159,14 +47,6 @@ INTEREST_TEMPLATES = {
 }
 
 
-def daterange(d0: date, d1: date):
-    cur = d0
-    one = timedelta(days=1)
-    while cur <= d1:
-        yield cur
-        cur += one
-
-
 def build_itinerary(city: str, start_d: date, end_d: date, pace: str, interests: List[str]) -> List[Event]:
     events: List[Event] = []
     # Per semplicità: 2 slot se pace="relax", 3 slot se pace="intenso" (default: 3)
@@ -183,19 +63,21 @@ def build_itinerary(city: str, start_d: date, end_d: date, pace: str, interests:
             "Punto panoramico",
         ]
 
-    ti = 0  # indice sul template
-    for d in daterange(start_d, end_d):
-        day_templates = templates[ti : ti + slots_per_day]
-        if len(day_templates) < slots_per_day:
-            # ricomincia se finisce la lista
-            ti = 0
-            day_templates = templates[ti : ti + slots_per_day]
-        ti += slots_per_day
-
-        for idx, (t0, t1, _label) in enumerate(SLOTS[:slots_per_day]):
-            title = f"{day_templates[idx]} — {city}"
-            start_dt = datetime.combine(d, t0)
-            end_dt = datetime.combine(d, t1)
+    slot_deltas = SLOT_DELTAS[:slots_per_day]
+
+    n_days = (end_d - start_d).days + 1
+    start_ord = start_d.toordinal()
+    days = [date.fromordinal(start_ord + i) for i in range(n_days)]
+
+    # titoli pronti una volta; la rotazione riparte dall'inizio quando finisce la lista
+    titles = [f"{t} — {city}" for t in templates]
+    n_titles = len(titles)
+    for day_i, d in enumerate(days):
+        midnight = datetime(d.year, d.month, d.day)
+        for idx, (off0, off1, _label) in enumerate(slot_deltas):
+            title = titles[(day_i * slots_per_day + idx) % n_titles]
+            start_dt = midnight + off0
+            end_dt = midnight + off1
             events.append(
                 Event(
                     title=title,
@@ -212,6 +94,9 @@ def build_itinerary(city: str, start_d: date, end_d: date, pace: str, interests:
 # CLI agent (no LLM)
 # ==========================
 
+_ISO_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
 def ask(prompt: str, default: Optional[str] = None) -> str:
     msg = prompt
     if default:
@@ -233,6 +118,9 @@ def main():
     interests = [s.strip().lower() for s in interests_s.split(",") if s.strip()]
 
     try:
+        for s in (d_from_s, d_to_s):
+            if not _ISO_RE.fullmatch(s):
+                raise ValueError(f"Formato data non valido (atteso YYYY-MM-DD): {s!r}")
         d_from = date.fromisoformat(d_from_s)
         d_to = date.fromisoformat(d_to_s)
         if d_to < d_from:
@@ -245,22 +133,22 @@ def main():
     events = build_itinerary(city, d_from, d_to, pace, interests)
 
     # Genera file .ics
-    ics = make_ics(title, events, add_alarm_minutes=30)
     fname = "tripplanner_mvp.ics"
-    with open(fname, "w", encoding="utf-8") as f:
-        f.write(ics)
+    with open(fname, "w", encoding="utf-8", newline="") as f:
+        f.writelines(iter_ics_lines(title, events, alarm_min=30))
 
     print("\nItinerario creato!\n")
-    for i, e in enumerate(events, 1):
-        print(f"{i:02d}. {e.title} | {e.start.strftime('%a %d %b %H:%M')} → {e.end.strftime('%H:%M')}")
+    sys.stdout.write("".join(
+        f"{i:02d}. {e.title} | {e.start.strftime('%a %d %b %H:%M')} → {e.end.strftime('%H:%M')}\n"
+        for i, e in enumerate(events, 1)
+    ))
 
     print(f"\n📅 File calendario generato: {fname}")
     print("(Importalo su Google Calendar / Apple / Outlook)")
 
     # Stampa link Google Calendar per ogni evento
     print("\nLink 'Aggiungi a Google Calendar' per i singoli eventi:")
-    for i, e in enumerate(events, 1):
-        print(f"{i:02d}. {gcal_link(e)}")
+    sys.stdout.write("".join(f"{i:02d}. {gcal_link(e)}\n" for i, e in enumerate(events, 1)))
 
 
 if __name__ == "__main__":
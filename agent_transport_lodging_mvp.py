@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-TripPlanner — MVP Transport+Lodging Agent (single-file, no deps)
+TripPlanner — MVP Transport+Lodging Agent (no deps)
 Obiettivo: dati origine, destinazione e date, trova
 - SOLUZIONE DI TRASPORTO (volo / treno / auto) migliore per tempo/costo
 - SISTEMAZIONE (hotel/bnb) ben recensita entro budget
@@ -9,20 +9,27 @@ Nota: provider MOCK per ora. Struttura pronta per sostituzione con API reali (Sk
 Output:
 - riepilogo a schermo con best option
 - file .ics con 3 eventi: Partenza, Check-in, Check-out (più ritorno se presente)
-- link "Aggiungi a Google Calendar" per ciascun evento
+- link "Aggiungi a Google Calendar" per ciascun evento (calendario condiviso in tripplanner/ics.py)
+
+NumPy è opzionale: se installato, lo scoring delle opzioni è vettorizzato quando i provider ne restituiscono molte
+(e compilato con Numba, se disponibile) — vedi tripplanner/scoring.py.
 """
 from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime, date, time, timedelta
-from typing import List, Optional, Dict
-import uuid
-import urllib.parse as _url
+from typing import List, Optional
+import re
+import sys
+
+from tripplanner.ics import Event, gcal_link, iter_ics_lines
+from tripplanner.scoring import best_lodging, best_transport
+from tripplanner.scoring import score_lodging as _score_lodging, score_transport as _score_transport
 
 # ==========================
 # Models
 # ==========================
 
-@dataclass
+@dataclass(slots=True)
 class TransportOption:
     mode: str  # "flight" | "train" | "drive"
     provider: str
@@ -33,7 +40,7 @@ class TransportOption:
     transfers: int = 0
     notes: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class LodgingOption:
     name: str
     location: str
@@ -42,15 +49,6 @@ class LodgingOption:
     reviews_count: int
     url: Optional[str] = None
 
-@dataclass
-class Event:
-    title: str
-    start: datetime
-    end: datetime
-    location: Optional[str] = None
-    url: Optional[str] = None
-    notes: Optional[str] = None
-
 # ==========================
 # MOCK providers (replace later)
 # ==========================
@@ -90,111 +88,19 @@ def mock_lodging(city: str, d_from: date, d_to: date, max_per_night: Optional[fl
     return out
 
 # ==========================
-# Scoring
+# Scoring: formule e kernel in tripplanner/scoring.py
 # ==========================
 
 def score_transport(opt: TransportOption, w_price=0.55, w_time=0.35, w_transfers=0.10) -> float:
-    # lower price/time/transfers better → convert to scores ~ [0..1]
-    # naive normalization using reasonable caps
-    price_cap = 200
-    time_cap = 420  # 7h
-    transfers_cap = 2
-    s_price = max(0.0, 1 - (opt.price_eur / price_cap))
-    s_time = max(0.0, 1 - (opt.duration_min / time_cap))
-    s_transfers = max(0.0, 1 - (opt.transfers / transfers_cap))
-    return w_price * s_price + w_time * s_time + w_transfers * s_transfers
+    return _score_transport(opt.price_eur, opt.duration_min, opt.transfers, w_price, w_time, w_transfers)
 
 def score_lodging(opt: LodgingOption, w_rating=0.7, w_price=0.3) -> float:
-    # higher rating better, lower price better
-    rating_score = opt.rating / 5.0
-    price_cap = 180
-    price_score = max(0.0, 1 - (opt.price_per_night_eur / price_cap))
-    # reviews bonus (log-like)
-    reviews_bonus = min(0.1, (opt.reviews_count / 2000) * 0.1)
-    return w_rating * rating_score + w_price * price_score + reviews_bonus
+    return _score_lodging(opt.rating, opt.price_per_night_eur, opt.reviews_count, w_rating, w_price)
 
 # ==========================
-# Calendar (.ics) + GCal links
+# Calendar (.ics): vedi tripplanner/ics.py
 # ==========================
-TZID = "Europe/Rome"
-
-def _escape_ics(text: Optional[str]) -> str:
-    if not text:
-        return ""
-    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
-
-def _fmt(dt: datetime) -> str:
-    return dt.strftime("%Y%m%dT%H%M%S")
-
-VTIMEZONE_EUROPE_ROME = "\r\n".join([
-    "BEGIN:VTIMEZONE",
-    "TZID:Europe/Rome",
-    "X-LIC-LOCATION:Europe/Rome",
-    "BEGIN:DAYLIGHT",
-    "TZOFFSETFROM:+0100",
-    "TZOFFSETTO:+0200",
-    "TZNAME:CEST",
-    "DTSTART:19700329T020000",
-    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
-    "END:DAYLIGHT",
-    "BEGIN:STANDARD",
-    "TZOFFSETFROM:+0200",
-    "TZOFFSETTO:+0100",
-    "TZNAME:CET",
-    "DTSTART:19701025T030000",
-    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
-    "END:STANDARD",
-    "END:VTIMEZONE",
-])
-
-def make_ics(title: str, events: List[Event], alarm_min: int = 30) -> str:
-    now_utc = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    head = [
-        "BEGIN:VCALENDAR",
-        "PRODID:-//TripPlanner AI//Transport+Lodging//IT",
-        "VERSION:2.0",
-        "CALSCALE:GREGORIAN",
-        f"X-WR-CALNAME:{_escape_ics(title)}",
-        f"X-WR-TIMEZONE:{TZID}",
-        VTIMEZONE_EUROPE_ROME,
-    ]
-    body = []
-    for e in events:
-        uid = f"{uuid.uuid4()}@tripplanner"
-        body += [
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{now_utc}",
-            f"DTSTART;TZID={TZID}:{_fmt(e.start)}",
-            f"DTEND;TZID={TZID}:{_fmt(e.end)}",
-            f"SUMMARY:{_escape_ics(e.title)}",
-        ]
-        if e.location:
-            body.append(f"LOCATION:{_escape_ics(e.location)}")
-        desc = []
-        if e.notes:
-            desc.append(e.notes)
-        if e.url:
-            desc.append(f"Link: {e.url}")
-        if desc:
-            body.append(f"DESCRIPTION:{_escape_ics('\n'.join(desc))}")
-        if alarm_min:
-            body += [
-                "BEGIN:VALARM",
-                f"TRIGGER:-PT{int(alarm_min)}M",
-                "ACTION:DISPLAY",
-                "DESCRIPTION:Promemoria",
-                "END:VALARM",
-            ]
-        body.append("END:VEVENT")
-    tail = ["END:VCALENDAR"]
-    return "\r\n".join(head + body + tail) + "\r\n"
-
-
-def gcal_link(e: Event) -> str:
-    base = "https://calendar.google.com/calendar/render?action=TEMPLATE"
-    q = {"text": e.title, "dates": f"{_fmt(e.start)}/{_fmt(e.end)}", "details": e.notes or "", "location": e.location or ""}
-    return base + "&" + _url.urlencode(q)
+PRODID = "-//TripPlanner AI//Transport+Lodging//IT"
 
 # ==========================
 # Planner core
@@ -208,19 +114,22 @@ def pick_best_transport(origin: str, dest: str, d: date, modes: List[str]) -> Tr
         options += mock_trains(origin, dest, d)
     if "drive" in modes:
         options += mock_drive(origin, dest, d)
-    # best by score
-    best = max(options, key=score_transport)
-    return best
+    if not options:
+        raise ValueError("Nessun mezzo di trasporto selezionato")
+    return best_transport(options)
 
 def pick_best_lodging(city: str, d_from: date, d_to: date, max_per_night: Optional[float]) -> LodgingOption:
     options = mock_lodging(city, d_from, d_to, max_per_night)
-    best = max(options, key=score_lodging)
-    return best
+    if not options:
+        raise ValueError("Nessuna sistemazione entro il budget")
+    return best_lodging(options)
 
 # ==========================
 # CLI agent
 # ==========================
 
+_ISO_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
 def ask(prompt: str, default: Optional[str] = None) -> str:
     msg = prompt
     if default:
@@ -240,6 +149,9 @@ def main():
     max_night_s = ask("Budget massimo per notte (vuoto = nessun limite)", "100")
 
     try:
+        for s in (d_from_s, d_to_s):
+            if not _ISO_RE.fullmatch(s):
+                raise ValueError(f"Formato data non valido (atteso YYYY-MM-DD): {s!r}")
         d_from = date.fromisoformat(d_from_s)
         d_to = date.fromisoformat(d_to_s)
         if d_to <= d_from:
@@ -252,14 +164,20 @@ def main():
     modes = [m.strip().lower() for m in modes_s.split(',') if m.strip()]
 
     # PICK SOLUTIONS
-    out_go = pick_best_transport(origin, dest, d_from, modes)
-    out_back = pick_best_transport(dest, origin, d_to, modes)
-    stay = pick_best_lodging(dest, d_from, d_to, max_per_night)
+    try:
+        out_go = pick_best_transport(origin, dest, d_from, modes)
+        out_back = pick_best_transport(dest, origin, d_to, modes)
+        stay = pick_best_lodging(dest, d_from, d_to, max_per_night)
+    except ValueError as e:
+        print(f"Errore input: {e}")
+        return
 
     # SUMMARY
     print("\nSoluzione migliore — TRASPORTI")
-    for leg_name, leg in [("Andata", out_go), ("Ritorno", out_back)]:
-        print(f"- {leg_name}: {leg.mode.upper()} {leg.provider} | {leg.dep_time.strftime('%d %b %H:%M')} → {leg.arr_time.strftime('%H:%M')} | {leg.duration_min} min | {leg.transfers} transiti | €{leg.price_eur:.0f} | {leg.notes or ''}")
+    sys.stdout.write("".join(
+        f"- {leg_name}: {leg.mode.upper()} {leg.provider} | {leg.dep_time.strftime('%d %b %H:%M')} → {leg.arr_time.strftime('%H:%M')} | {leg.duration_min} min | {leg.transfers} transiti | €{leg.price_eur:.0f} | {leg.notes or ''}\n"
+        for leg_name, leg in (("Andata", out_go), ("Ritorno", out_back))
+    ))
 
     print("\nSoluzione migliore — SISTEMAZIONE")
     nights = (d_to - d_from).days
@@ -276,15 +194,13 @@ def main():
         Event(title=f"Ritorno {dest} → {origin} ({out_back.provider})", start=out_back.dep_time, end=out_back.arr_time, location=dest, notes=f"{out_back.mode} | €{out_back.price_eur:.0f} | {out_back.notes or ''}"),
     ]
 
-    ics = make_ics(f"{dest} — viaggio", events, alarm_min=45)
     fname = "tripplanner_transport_lodging.ics"
-    with open(fname, "w", encoding="utf-8") as f:
-        f.write(ics)
+    with open(fname, "w", encoding="utf-8", newline="") as f:
+        f.writelines(iter_ics_lines(f"{dest} — viaggio", events, alarm_min=45, prodid=PRODID))
 
     print(f"\n📅 Calendario generato: {fname}")
     print("Link 'Aggiungi a Google Calendar' (singoli eventi):")
-    for i, e in enumerate(events, 1):
-        print(f"{i:02d}. {gcal_link(e)}")
+    sys.stdout.write("".join(f"{i:02d}. {gcal_link(e)}\n" for i, e in enumerate(events, 1)))
 
 
 if __name__ == "__main__":
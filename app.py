@@ -1,15 +1,25 @@
 from __future__ import annotations
-from flask import Flask, request, make_response
+from flask import Flask, Response, request
 from dataclasses import dataclass
 from datetime import datetime, date, time, timedelta
-from typing import Optional, List
-import urllib.parse as _url
+from typing import FrozenSet, Optional, List, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import chain
+from string import Template
+from threading import Lock
+from time import monotonic
+import hashlib
 import uuid
 
+from tripplanner.ics import Event, gcal_link, make_ics
+from tripplanner.scoring import best_lodging, best_transport
+from tripplanner.scoring import score_lodging as _score_lodging, score_transport as _score_transport
+
 app = Flask(__name__)
 
 # ---------- Modelli ----------
-@dataclass
+@dataclass(slots=True, frozen=True, eq=False)
 class TransportOption:
     mode: str      # "flight" | "train" | "drive"
     provider: str
@@ -20,7 +30,7 @@ class TransportOption:
     transfers: int = 0
     notes: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True, frozen=True, eq=False)
 class LodgingOption:
     name: str
     location: str
@@ -29,34 +39,33 @@ class LodgingOption:
     reviews_count: int
     url: Optional[str] = None
 
-@dataclass
-class Event:
-    title: str
-    start: datetime
-    end: datetime
-    location: Optional[str] = None
-    url: Optional[str] = None
-    notes: Optional[str] = None
-
 # ---------- Provider MOCK ----------
+# (provider, partenza, arrivo, prezzo €, durata min, transiti, note): orari come offset dalla mezzanotte
+_FLIGHT_SPECS = (
+    ("ITA Airways", timedelta(hours=8), timedelta(hours=10, minutes=25), 79, 145, 0, "Diretto"),
+    ("Ryanair", timedelta(hours=14), timedelta(hours=16, minutes=35), 39, 155, 0, "Diretto"),
+    ("Lufthansa", timedelta(hours=9), timedelta(hours=12, minutes=40), 129, 220, 1, "1 scalo FRA"),
+)
+_TRAIN_SPECS = (
+    ("Frecciarossa", timedelta(hours=7, minutes=30), timedelta(hours=10, minutes=35), 59, 185, 0, "Alta velocità"),
+    ("Italo", timedelta(hours=8, minutes=30), timedelta(hours=11, minutes=30), 49, 240, 0, "Diretto"),
+)
+_DRIVE_SPECS = (
+    ("Auto (stima)", timedelta(hours=6, minutes=45), timedelta(hours=11, minutes=5), 45, 260, 0, "Carburante+pedaggi stimati"),
+)
+
+def _from_specs(mode: str, specs: tuple, d: date) -> List[TransportOption]:
+    midnight = datetime.combine(d, time())
+    return [TransportOption(mode, prov, midnight+dep, midnight+arr, p, dur, tr, notes) for prov, dep, arr, p, dur, tr, notes in specs]
+
 def mock_flights(origin: str, dest: str, d: date) -> List[TransportOption]:
-    base = datetime.combine(d, time(8, 0))
-    return [
-        TransportOption("flight", "ITA Airways", base, base + timedelta(hours=2, minutes=25), 79, 145, 0, "Diretto"),
-        TransportOption("flight", "Ryanair", base + timedelta(hours=6), base + timedelta(hours=8, minutes=35), 39, 155, 0, "Diretto"),
-        TransportOption("flight", "Lufthansa", base + timedelta(hours=1), base + timedelta(hours=4, minutes=40), 129, 220, 1, "1 scalo FRA"),
-    ]
+    return _from_specs("flight", _FLIGHT_SPECS, d)
 
 def mock_trains(origin: str, dest: str, d: date) -> List[TransportOption]:
-    base = datetime.combine(d, time(7, 30))
-    return [
-        TransportOption("train", "Frecciarossa", base, base + timedelta(hours=3, minutes=5), 59, 185, 0, "Alta velocità"),
-        TransportOption("train", "Italo", base + timedelta(hours=1), base + timedelta(hours=4, minutes=0), 49, 240, 0, "Diretto"),
-    ]
+    return _from_specs("train", _TRAIN_SPECS, d)
 
 def mock_drive(origin: str, dest: str, d: date) -> List[TransportOption]:
-    base = datetime.combine(d, time(6, 45))
-    return [TransportOption("drive", "Auto (stima)", base, base + timedelta(hours=4, minutes=20), 45, 260, 0, "Carburante+pedaggi stimati")]
+    return _from_specs("drive", _DRIVE_SPECS, d)
 
 def mock_lodging(city: str, d_from: date, d_to: date, max_per_night: Optional[float]) -> List[LodgingOption]:
     data = [
@@ -67,80 +76,39 @@ def mock_lodging(city: str, d_from: date, d_to: date, max_per_night: Optional[fl
     ]
     return [l for l in data if (max_per_night is None or l.price_per_night_eur <= max_per_night)]
 
-# ---------- Scoring ----------
+# ---------- Scoring (tripplanner/scoring.py) ----------
 def score_transport(opt: TransportOption, w_price=0.55, w_time=0.35, w_transfers=0.10) -> float:
-    price_cap, time_cap, transfers_cap = 200, 420, 2
-    s_price = max(0.0, 1 - (opt.price_eur / price_cap))
-    s_time = max(0.0, 1 - (opt.duration_min / time_cap))
-    s_transfers = max(0.0, 1 - (opt.transfers / transfers_cap))
-    return w_price*s_price + w_time*s_time + w_transfers*s_transfers
+    return _score_transport(opt.price_eur, opt.duration_min, opt.transfers, w_price, w_time, w_transfers)
 
 def score_lodging(opt: LodgingOption, w_rating=0.7, w_price=0.3) -> float:
-    rating_score = opt.rating / 5.0
-    price_cap = 180
-    price_score = max(0.0, 1 - (opt.price_per_night_eur / price_cap))
-    reviews_bonus = min(0.1, (opt.reviews_count / 2000) * 0.1)
-    return w_rating*rating_score + w_price*price_score + reviews_bonus
+    return _score_lodging(opt.rating, opt.price_per_night_eur, opt.reviews_count, w_rating, w_price)
 
 # ---------- ICS + GCal ----------
-TZID = "Europe/Rome"
-
-def _fmt(dt: datetime) -> str:
-    return dt.strftime("%Y%m%dT%H%M%S")
-
-def make_ics(title: str, events: List[Event], alarm_min: int = 45) -> str:
-    now_utc = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    lines = [
-        "BEGIN:VCALENDAR",
-        "PRODID:-//TripPlanner AI//Transport+Lodging//IT",
-        "VERSION:2.0",
-        "CALSCALE:GREGORIAN",
-        f"X-WR-CALNAME:{title}",
-        f"X-WR-TIMEZONE:{TZID}",
-    ]
-    for e in events:
-        lines += [
-            "BEGIN:VEVENT",
-            f"UID:{uuid.uuid4()}@tripplanner",
-            f"DTSTAMP:{now_utc}",
-            f"DTSTART;TZID={TZID}:{_fmt(e.start)}",
-            f"DTEND;TZID={TZID}:{_fmt(e.end)}",
-            f"SUMMARY:{e.title}",
-        ]
-        if e.location:
-            lines.append(f"LOCATION:{e.location}")
-        desc = []
-        if e.notes: desc.append(e.notes)
-        if e.url:   desc.append(f"Link: {e.url}")
-        if desc:
-            lines.append("DESCRIPTION:" + "\\n".join(desc))
-        if alarm_min:
-            lines += [
-                "BEGIN:VALARM",
-                f"TRIGGER:-PT{int(alarm_min)}M",
-                "ACTION:DISPLAY",
-                "DESCRIPTION:Promemoria",
-                "END:VALARM",
-            ]
-        lines.append("END:VEVENT")
-    lines.append("END:VCALENDAR")
-    return "\r\n".join(lines) + "\r\n"
-
-def gcal_link(e: Event) -> str:
-    base = "https://calendar.google.com/calendar/render?action=TEMPLATE"
-    q = {"text": e.title, "dates": f"{_fmt(e.start)}/{_fmt(e.end)}", "details": e.notes or "", "location": e.location or ""}
-    return base + "&" + _url.urlencode(q)
+# .ics, Event e gcal_link da tripplanner.ics (stessa implementazione degli agent CLI)
+PRODID = "-//TripPlanner AI//Transport+Lodging//IT"
 
 # ---------- Core ----------
-def pick_best_transport(origin: str, dest: str, d: date, modes: List[str]) -> TransportOption:
-    options: List[TransportOption] = []
-    if "flight" in modes: options += mock_flights(origin, dest, d)
-    if "train" in modes:  options += mock_trains(origin, dest, d)
-    if "drive" in modes:  options += mock_drive(origin, dest, d)
-    return max(options, key=score_transport)
-
+_ALL_MODES: FrozenSet[str] = frozenset(("flight", "train", "drive"))
+
+# Provider deterministici e opzioni immutabili: il risultato si può memoizzare per argomenti
+@lru_cache(maxsize=1024)
+def pick_best_transport(origin: str, dest: str, d: date, modes: FrozenSet[str]) -> TransportOption:
+    # una sola lista costruita in blocco invece di tre estensioni successive
+    parts = []
+    if "flight" in modes: parts.append(mock_flights(origin, dest, d))
+    if "train" in modes:  parts.append(mock_trains(origin, dest, d))
+    if "drive" in modes:  parts.append(mock_drive(origin, dest, d))
+    options: List[TransportOption] = list(chain.from_iterable(parts))
+    if not options:
+        raise ValueError("Nessun mezzo di trasporto selezionato")
+    return best_transport(options)
+
+@lru_cache(maxsize=1024)
 def pick_best_lodging(city: str, d_from: date, d_to: date, max_per_night: Optional[float]) -> LodgingOption:
-    return max(mock_lodging(city, d_from, d_to, max_per_night), key=score_lodging)
+    options = mock_lodging(city, d_from, d_to, max_per_night)
+    if not options:
+        raise ValueError("Nessuna sistemazione entro il budget")
+    return best_lodging(options)
 
 # ---------- Pagine ----------
 FORM_HTML = """<!doctype html>
@@ -164,55 +132,112 @@ FORM_HTML = """<!doctype html>
 </form>
 """
 
+# segnaposto $-style: il template è compilato una volta sola (_RESULT_TPL)
 RESULT_HTML = """<!doctype html>
 <html lang=it><meta charset="utf-8">
 <title>Risultati — TripPlanner</title>
 <h1>Risultati</h1>
 <h2>Trasporti</h2>
-<p><b>Andata</b>: {go_mode} {go_provider} · {go_dep} → {go_arr} · {go_dur} min · {go_tr} transiti · €{go_price} · {go_notes}</p>
-<p><b>Ritorno</b>: {bk_mode} {bk_provider} · {bk_dep} → {bk_arr} · {bk_dur} min · {bk_tr} transiti · €{bk_price} · {bk_notes}</p>
+<p><b>Andata</b>: ${go_mode} ${go_provider} · ${go_dep} → ${go_arr} · ${go_dur} min · ${go_tr} transiti · €${go_price} · ${go_notes}</p>
+<p><b>Ritorno</b>: ${bk_mode} ${bk_provider} · ${bk_dep} → ${bk_arr} · ${bk_dur} min · ${bk_tr} transiti · €${bk_price} · ${bk_notes}</p>
 
 <h2>Sistemazione</h2>
-<p><b>{stay_name}</b> ({stay_loc}) — Rating {stay_rating}/5 ({stay_rev} recensioni)<br>
-€{stay_ppn}/notte × {nights} = <b>€{total_stay}</b><br>
-{stay_link}
+<p><b>${stay_name}</b> (${stay_loc}) — Rating ${stay_rating}/5 (${stay_rev} recensioni)<br>
+€${stay_ppn}/notte × ${nights} = <b>€${total_stay}</b><br>
+${stay_link}
 </p>
 
-<p><a href="/download_ics?token={token}">⬇️ Scarica calendario (.ics)</a></p>
+<p><a href="/download_ics?token=${token}">⬇️ Scarica calendario (.ics)</a></p>
 
 <h3>Aggiungi i singoli eventi su Google Calendar</h3>
 <ol>
-  {gcal_items}
+  ${gcal_items}
 </ol>
 
 <p><a href="/">↩︎ Nuova ricerca</a></p>
 """
-
-ICS_STORE = {}
+_RESULT_TPL = Template(RESULT_HTML)
+
+_LI_TMPL = '<li><a href="%s" target="_blank" rel="noopener">Aggiungi evento %d</a></li>'
+
+_FMT_DATETIME = "%d %b %H:%M"
+_FMT_TIME = "%H:%M"
+
+def _leg_ctx(prefix: str, leg: TransportOption) -> dict:
+    # segnaposto di _RESULT_TPL per una tratta (go_* / bk_*)
+    return {
+        f"{prefix}_mode": leg.mode.upper(), f"{prefix}_provider": leg.provider,
+        f"{prefix}_dep": leg.dep_time.strftime(_FMT_DATETIME), f"{prefix}_arr": leg.arr_time.strftime(_FMT_TIME),
+        f"{prefix}_dur": leg.duration_min, f"{prefix}_tr": leg.transfers,
+        f"{prefix}_price": int(leg.price_eur), f"{prefix}_notes": leg.notes or "",
+    }
+
+# Calendari generati per token: LRU limitato + scadenza, così la memoria non cresce con l'uptime
+_MAX_ICS = 1024
+_ICS_TTL_S = 3600
+ICS_STORE: OrderedDict[str, Tuple[float, bytes]] = OrderedDict()
+# il server threaded di Flask serve più richieste insieme: leggi+modifica sotto lock
+_ICS_LOCK = Lock()
+
+def _store_ics(token: str, ics: bytes) -> None:
+    with _ICS_LOCK:
+        ICS_STORE[token] = (monotonic(), ics)
+        if len(ICS_STORE) > _MAX_ICS:
+            ICS_STORE.popitem(last=False)
+
+def _load_ics(token: Optional[str]) -> Optional[bytes]:
+    with _ICS_LOCK:
+        item = ICS_STORE.get(token)
+        if item is None:
+            return None
+        stored_at, ics = item
+        if monotonic() - stored_at > _ICS_TTL_S:
+            del ICS_STORE[token]
+            return None
+        ICS_STORE.move_to_end(token)
+        return ics
+
+# La form è statica: corpo ed ETag calcolati una volta; Response nuova per richiesta
+# (un oggetto condiviso verrebbe mutato da make_conditional / after_request)
+_FORM_BODY = FORM_HTML.encode("utf-8")
+_FORM_ETAG = hashlib.md5(_FORM_BODY).hexdigest()
 
 @app.get("/")
 def index():
-    return FORM_HTML
+    resp = Response(_FORM_BODY, mimetype="text/html")
+    resp.headers["Cache-Control"] = "public, max-age=3600"
+    resp.set_etag(_FORM_ETAG)
+    return resp.make_conditional(request)
+
+def _parse_int(form, key: str, default: int) -> int:
+    # campo assente o vuoto → default; testo non numerico → ValueError (400 in plan)
+    raw = form.get(key, "").strip()
+    return int(raw) if raw else default
 
 @app.post("/plan")
 def plan():
     try:
-        origin = request.form.get("origin","").strip()
-        dest   = request.form.get("dest","").strip()
-        d_from = date.fromisoformat(request.form.get("d_from"))
-        d_to   = date.fromisoformat(request.form.get("d_to"))
+        form = request.form
+        origin = form.get("origin", "").strip()
+        dest   = form.get("dest", "").strip()
+        d_from = date.fromisoformat(form.get("d_from", ""))
+        d_to   = date.fromisoformat(form.get("d_to", ""))
         if d_to <= d_from:
             return "<h1>Errore</h1><p>La data di ritorno deve essere dopo la partenza.</p><p><a href='/'>Torna indietro</a></p>", 400
-        modes = request.form.getlist("modes") or ["flight","train","drive"]
-        max_night = request.form.get("max_night","").strip()
-        alarm_min = int(request.form.get("alarm_min","45").strip())
+        modes = frozenset(form.getlist("modes")) or _ALL_MODES
+        max_night = form.get("max_night", "").strip()
+        alarm_min = _parse_int(form, "alarm_min", 45)
         max_per_night = float(max_night) if max_night else None
     except Exception as e:
         return f"<h1>Errore input</h1><p>{e}</p><p><a href='/'>Torna indietro</a></p>", 400
 
-    go   = pick_best_transport(origin, dest, d_from, modes)
-    back = pick_best_transport(dest, origin, d_to, modes)
-    stay = pick_best_lodging(dest, d_from, d_to, max_per_night)
+    try:
+        go   = pick_best_transport(origin, dest, d_from, modes)
+        back = pick_best_transport(dest, origin, d_to, modes)
+        stay = pick_best_lodging(dest, d_from, d_to, max_per_night)
+    except ValueError as e:
+        # nessuna opzione per i mezzi/budget scelti
+        return f"<h1>Errore input</h1><p>{e}</p><p><a href='/'>Torna indietro</a></p>", 400
 
     nights = (d_to - d_from).days
     total_stay = int(stay.price_per_night_eur * nights)
@@ -223,32 +248,30 @@ def plan():
         Event(title=f"Check-out {stay.name}", start=datetime.combine(d_to, time(11,0)), end=datetime.combine(d_to, time(11,30)), location=stay.location, url=stay.url),
         Event(title=f"Ritorno {dest} → {origin} ({back.provider})", start=back.dep_time, end=back.arr_time, location=dest, notes=f"{back.mode} · €{int(back.price_eur)} · {back.notes or ''}"),
     ]
-    ics = make_ics(f"{dest} — viaggio", events, alarm_min=alarm_min)
+    ics = make_ics(f"{dest} — viaggio", events, alarm_min=alarm_min, prodid=PRODID)
     token = uuid.uuid4().hex
-    ICS_STORE[token] = ics
+    _store_ics(token, ics.encode("utf-8"))
 
-    gcal_items = "".join([f'<li><a href="{gcal_link(e)}" target="_blank" rel="noopener">Aggiungi evento {i+1}</a></li>' for i, e in enumerate(events)])
+    gcal_items = "".join(_LI_TMPL % (gcal_link(e), i) for i, e in enumerate(events, 1))
     stay_link = f'<a href="{stay.url}" target="_blank" rel="noopener">Apri link struttura</a>' if stay.url else ""
 
-    html = RESULT_HTML.format(
-        go_mode=go.mode.upper(), go_provider=go.provider, go_dep=go.dep_time.strftime("%d %b %H:%M"),
-        go_arr=go.arr_time.strftime("%H:%M"), go_dur=go.duration_min, go_tr=go.transfers, go_price=int(go.price_eur), go_notes=(go.notes or ""),
-        bk_mode=back.mode.upper(), bk_provider=back.provider, bk_dep=back.dep_time.strftime("%d %b %H:%M"),
-        bk_arr=back.arr_time.strftime("%H:%M"), bk_dur=back.duration_min, bk_tr=back.transfers, bk_price=int(back.price_eur), bk_notes=(back.notes or ""),
+    ctx = _leg_ctx("go", go)
+    ctx.update(_leg_ctx("bk", back))
+    ctx.update(
         stay_name=stay.name, stay_loc=stay.location, stay_rating=stay.rating, stay_rev=stay.reviews_count, stay_ppn=int(stay.price_per_night_eur),
         nights=nights, total_stay=total_stay, stay_link=stay_link,
-        token=token, gcal_items=gcal_items
+        token=token, gcal_items=gcal_items,
     )
-    return html
+    return _RESULT_TPL.substitute(ctx)
 
 @app.get("/download_ics")
 def download_ics():
     token = request.args.get("token")
-    ics = ICS_STORE.get(token)
+    ics = _load_ics(token)
     if not ics:
         return "Calendario non trovato", 404
-    resp = make_response(ics)
-    resp.headers["Content-Type"] = "text/calendar; charset=utf-8"
+    # già codificato in /plan: il server WSGI invia il buffer così com'è
+    resp = Response(ics, mimetype="text/calendar", direct_passthrough=True)
     resp.headers["Content-Disposition"] = f"attachment; filename=tripplanner_{token}.ics"
     return resp
 
@@ -1,32 +1,14 @@
 from datetime import datetime
-import uuid
 
-TZID = "Europe/Rome"
+from tripplanner.ics import Event, make_ics as _make_ics
 
-def make_ics(trip_title: str, events: list, add_alarm_minutes: int = 30) -> str:
-    now_utc = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    header = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        f"X-WR-CALNAME:{trip_title}",
-    ]
-
-    body_lines = []
-    for e in events:
-        uid = f"{uuid.uuid4()}@tripplanner.ai"
-        body = [
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{now_utc}",
-            f"DTSTART:{e['start'].strftime('%Y%m%dT%H%M%S')}",
-            f"DTEND:{e['end'].strftime('%Y%m%dT%H%M%S')}",
-            f"SUMMARY:{e['title']}",
-            "END:VEVENT",
-        ]
-        body_lines += body
+PRODID = "-//TripPlanner AI//Export//IT"
 
-    footer = ["END:VCALENDAR"]
-    return "\r\n".join(header + body_lines + footer) + "\r\n"
+def make_ics(trip_title: str, events: list, add_alarm_minutes: int = 0) -> str:
+    # eventi come dict (title/start/end + location/url/notes opzionali) → implementazione condivisa;
+    # orari floating (nessun TZID) e promemoria solo se richiesto
+    evs = [Event(e['title'], e['start'], e['end'], e.get('location'), e.get('url'), e.get('notes')) for e in events]
+    return _make_ics(trip_title, evs, alarm_min=add_alarm_minutes, prodid=PRODID, tzid=None)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,2 @@
+# conftest alla root: pytest aggiunge questa cartella a sys.path, così i test
+# importano app.py, gli agent e il package tripplanner anche lanciando `pytest`
@@ -0,0 +1,83 @@
+import re
+from datetime import datetime
+from urllib.parse import urlencode
+
+import pytest
+
+from tripplanner.ics import Event, gcal_link, make_ics
+
+EV = Event("Visita", datetime(2025, 10, 18, 17, 0), datetime(2025, 10, 18, 19, 30))
+
+
+def _norm(ics):
+    ics = re.sub(r"UID:[0-9a-f-]{36}@tripplanner", "UID:X", ics)
+    return re.sub(r"DTSTAMP:\d{8}T\d{6}Z", "DTSTAMP:X", ics)
+
+
+def test_europe_rome_calendar():
+    ics = make_ics("Roma", [EV], alarm_min=0, prodid="-//T//X//IT")
+    head, vtz, rest = ics.partition("BEGIN:VTIMEZONE\r\n")
+    assert head == (
+        "BEGIN:VCALENDAR\r\nPRODID:-//T//X//IT\r\nVERSION:2.0\r\nCALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n"
+        "X-WR-CALNAME:Roma\r\nX-WR-TIMEZONE:Europe/Rome\r\n"
+    )
+    assert vtz and rest.count("END:VTIMEZONE\r\n") == 1
+    assert _norm(rest.split("END:VTIMEZONE\r\n", 1)[1]) == (
+        "BEGIN:VEVENT\r\nUID:X\r\nDTSTAMP:X\r\n"
+        "DTSTART;TZID=Europe/Rome:20251018T170000\r\nDTEND;TZID=Europe/Rome:20251018T193000\r\n"
+        "SUMMARY:Visita\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def test_floating_calendar():
+    ics = _norm(make_ics("Roma", [EV], alarm_min=0, prodid="-//T//X//IT", tzid=None))
+    assert ics == (
+        "BEGIN:VCALENDAR\r\nPRODID:-//T//X//IT\r\nVERSION:2.0\r\nCALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n"
+        "X-WR-CALNAME:Roma\r\n"
+        "BEGIN:VEVENT\r\nUID:X\r\nDTSTAMP:X\r\nDTSTART:20251018T170000\r\nDTEND:20251018T193000\r\n"
+        "SUMMARY:Visita\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+
+
+def test_unknown_tzid_rejected():
+    with pytest.raises(ValueError):
+        make_ics("Roma", [EV], tzid="America/New_York")
+
+
+def test_text_escaping():
+    e = Event("a,b;c\\d\ne\r\nf", EV.start, EV.end, location="x;y", url="http://u,v", notes="n1\nn2")
+    ics = make_ics("T,1", [e], alarm_min=0, tzid=None)
+    assert "X-WR-CALNAME:T\\,1\r\n" in ics
+    assert "SUMMARY:a\\,b\\;c\\\\d\\ne\\nf\r\n" in ics
+    assert "LOCATION:x\\;y\r\n" in ics
+    assert "DESCRIPTION:n1\\nn2\\nLink: http://u\\,v\r\n" in ics
+
+
+@pytest.mark.parametrize("alarm_min, trigger", [(0, None), (-5, None), (30, "-PT30M"), (7, "-PT7M")])
+def test_valarm(alarm_min, trigger):
+    ics = make_ics("T", [EV, EV], alarm_min=alarm_min, tzid=None)
+    if trigger is None:
+        assert "BEGIN:VALARM" not in ics
+    else:
+        assert ics.count(f"BEGIN:VALARM\r\nTRIGGER:{trigger}\r\nACTION:DISPLAY\r\n") == 2
+
+
+def test_uids_are_unique_uuid4():
+    uids = re.findall(r"UID:(\S+)@tripplanner", make_ics("T", [EV] * 5))
+    assert len(set(uids)) == 5
+    assert all(re.fullmatch(r"[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}", u) for u in uids)
+
+
+@pytest.mark.parametrize("e", [
+    EV,
+    Event("Caffè & cornetto/è", EV.start, EV.end, location="Piazza S. Marco, 1", notes="a+b=c?\nd"),
+])
+def test_gcal_link_matches_urlencode(e):
+    params = {
+        "action": "TEMPLATE",
+        "text": e.title,
+        "dates": f"{e.start.strftime('%Y%m%dT%H%M%S')}/{e.end.strftime('%Y%m%dT%H%M%S')}",
+        "details": e.notes or "",
+        "location": e.location or "",
+    }
+    assert gcal_link(e) == "https://calendar.google.com/calendar/render?" + urlencode(params)
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+
+
+def _reset(monkeypatch, now):
+    app.ICS_STORE.clear()
+    clock = [now]
+    monkeypatch.setattr(app, "monotonic", lambda: clock[0])
+    return clock
+
+
+def test_store_evicts_least_recently_used(monkeypatch):
+    _reset(monkeypatch, 0.0)
+    monkeypatch.setattr(app, "_MAX_ICS", 2)
+    app._store_ics("a", b"A")
+    app._store_ics("b", b"B")
+    assert app._load_ics("a") == b"A"  # "a" diventa il più recente
+    app._store_ics("c", b"C")
+    assert app._load_ics("b") is None
+    assert app._load_ics("a") == b"A"
+    assert app._load_ics("c") == b"C"
+    assert len(app.ICS_STORE) == 2
+
+
+def test_load_expires_after_ttl(monkeypatch):
+    clock = _reset(monkeypatch, 100.0)
+    app._store_ics("t", b"ICS")
+    clock[0] += app._ICS_TTL_S
+    assert app._load_ics("t") == b"ICS"
+    clock[0] += app._ICS_TTL_S + 1
+    assert app._load_ics("t") is None
+    assert "t" not in app.ICS_STORE
+    assert app._load_ics("t") is None
+
+
+def test_load_unknown_token():
+    assert app._load_ics(None) is None
+    assert app._load_ics("missing") is None
+
+
+def test_concurrent_loads_of_expired_token(monkeypatch):
+    clock = _reset(monkeypatch, 0.0)
+    app._store_ics("t", b"ICS")
+    clock[0] += app._ICS_TTL_S + 1
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(app._load_ics, ["t"] * 64))
+    assert results == [None] * 64
+    assert "t" not in app.ICS_STORE
+
+
+def test_plan_then_download_round_trip():
+    app.ICS_STORE.clear()
+    client = app.app.test_client()
+    resp = client.post("/plan", data={
+        "origin": "Bologna", "dest": "Lisbona", "d_from": "2025-10-18", "d_to": "2025-10-21",
+        "modes": ["flight", "train"], "max_night": "100", "alarm_min": "45",
+    })
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    token = body.split("/download_ics?token=", 1)[1].split('"', 1)[0]
+
+    ics = client.get(f"/download_ics?token={token}")
+    assert ics.status_code == 200
+    assert ics.mimetype == "text/calendar"
+    assert ics.headers["Content-Disposition"] == f"attachment; filename=tripplanner_{token}.ics"
+    data = ics.get_data(as_text=True)
+    assert data.startswith("BEGIN:VCALENDAR\r\n") and data.endswith("END:VCALENDAR\r\n")
+    assert data.count("BEGIN:VEVENT") == 4
+    assert "TRIGGER:-PT45M" in data
+
+    assert client.get("/download_ics?token=missing").status_code == 404
@@ -0,0 +1,44 @@
+import random
+from datetime import date
+
+import pytest
+
+import agent_transport_lodging_mvp as agent
+import app
+from tripplanner import scoring
+
+
+def _transports(n, rng):
+    d = date(2025, 10, 18)
+    return [
+        app.TransportOption("train", f"P{i}", d, d, rng.randint(10, 300), rng.randint(60, 600), rng.randint(0, 3))
+        for i in range(n)
+    ]
+
+
+def _lodgings(n, rng):
+    return [
+        app.LodgingOption(f"L{i}", "X", rng.randint(30, 250), round(rng.uniform(3, 5), 1), rng.randint(0, 3000))
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("n", [1, 6, scoring._VEC_MIN_OPTIONS, 40])
+def test_best_matches_reference_score(n):
+    # piccoli insiemi: loop inlinato; da _VEC_MIN_OPTIONS in su: kernel NumPy/Numba
+    rng = random.Random(n)
+    for _ in range(50):
+        ts, ls = _transports(n, rng), _lodgings(n, rng)
+        best_t, best_l = scoring.best_transport(ts), scoring.best_lodging(ls)
+        assert app.score_transport(best_t) == pytest.approx(max(map(app.score_transport, ts)), abs=1e-6)
+        assert app.score_lodging(best_l) == pytest.approx(max(map(app.score_lodging, ls)), abs=1e-6)
+
+
+def test_score_wrappers_forward_weights():
+    t = agent.TransportOption("flight", "X", None, None, 79, 145, 1)
+    l = agent.LodgingOption("H", "X", 110, 4.5, 1800)
+    assert agent.score_transport(t, 1, 0, 0) == pytest.approx(1 - 79 / 200)
+    assert agent.score_transport(t, 0, 0, 1) == pytest.approx(0.5)
+    assert agent.score_lodging(l, 1, 0) == pytest.approx(4.5 / 5 + 0.09)
+    assert app.score_transport(t) == agent.score_transport(t) == scoring.score_transport(79, 145, 1)
+    assert app.score_lodging(l) == agent.score_lodging(l) == scoring.score_lodging(4.5, 110, 1800)
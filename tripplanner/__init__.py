@@ -0,0 +1 @@
+"""TripPlanner — moduli condivisi dagli agent CLI."""
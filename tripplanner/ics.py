@@ -0,0 +1,215 @@
+"""
+TripPlanner — calendario condiviso (.ics + link Google Calendar)
+- Modello Event usato dagli agent CLI e da app.py
+- make_ics / iter_ics_lines: VCALENDAR con VTIMEZONE Europe/Rome (o orari floating con
+  tzid=None) e promemoria opzionale; unica implementazione, usata anche da app.py e calendar_export.py
+- gcal_link: link "Aggiungi a Google Calendar" per un singolo evento
+
+Solo Python standard library.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional
+import os
+import time
+from urllib.parse import quote_from_bytes as _qb
+
+TZID = "Europe/Rome"
+
+
+@dataclass(slots=True)
+class Event:
+    title: str
+    start: datetime
+    end: datetime
+    location: Optional[str] = None
+    url: Optional[str] = None
+    notes: Optional[str] = None
+
+
+# ==========================
+# Calendar (.ics) utilities
+# ==========================
+
+# RFC 5545 TEXT escaping in un solo passaggio (niente doppio escape del backslash);
+# i \r dei form web vengono scartati
+_ICS_TRANS = str.maketrans({"\\": "\\\\", ";": "\\;", ",": "\\,", "\n": "\\n", "\r": ""})
+
+
+def _escape_ics(text: Optional[str]) -> str:
+    return text.translate(_ICS_TRANS) if text else ""
+
+
+def _fmt(dt: datetime) -> str:
+    # local naive datetime → basic format
+    return f"{dt.year:04d}{dt.month:02d}{dt.day:02d}T{dt.hour:02d}{dt.minute:02d}{dt.second:02d}"
+
+
+# DTSTAMP condiviso entro lo stesso secondo: [epoch_s, stringa UTC]
+_last_ts: list = [0, ""]
+
+
+def _dtstamp() -> str:
+    now = int(time.time())
+    if now != _last_ts[0]:
+        _last_ts[1] = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now))
+        _last_ts[0] = now
+    return _last_ts[1]
+
+
+def _uuid4_batch(n: int) -> List[str]:
+    # un solo os.urandom per tutti gli eventi; bit di versione/variante come uuid4()
+    raw = bytearray(os.urandom(16 * n))
+    out = []
+    for i in range(0, 16 * n, 16):
+        raw[i + 6] = (raw[i + 6] & 0x0F) | 0x40
+        raw[i + 8] = (raw[i + 8] & 0x3F) | 0x80
+        h = raw[i : i + 16].hex()
+        out.append(f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return out
+
+
+VTIMEZONE_EUROPE_ROME = "\r\n".join(
+    [
+        "BEGIN:VTIMEZONE",
+        "TZID:Europe/Rome",
+        "X-LIC-LOCATION:Europe/Rome",
+        "BEGIN:DAYLIGHT",
+        "TZOFFSETFROM:+0100",
+        "TZOFFSETTO:+0200",
+        "TZNAME:CEST",
+        "DTSTART:19700329T020000",
+        "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+        "END:DAYLIGHT",
+        "BEGIN:STANDARD",
+        "TZOFFSETFROM:+0200",
+        "TZOFFSETTO:+0100",
+        "TZNAME:CET",
+        "DTSTART:19701025T030000",
+        "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+        "END:STANDARD",
+        "END:VTIMEZONE",
+    ]
+)
+
+
+PRODID_MVP = "-//TripPlanner AI//MVP//IT"
+
+# Header statico: variano solo PRODID e X-WR-CALNAME
+_HEADER_PREFIX = "BEGIN:VCALENDAR\r\nPRODID:"
+_HEADER_MID = (
+    "\r\n"
+    "VERSION:2.0\r\n"
+    "CALSCALE:GREGORIAN\r\n"
+    "METHOD:PUBLISH\r\n"
+    "X-WR-CALNAME:"
+)
+
+
+def _vevent_tmpl(dt_param: str) -> str:
+    return (
+        "BEGIN:VEVENT\r\n"
+        "UID:{uid}\r\n"
+        "DTSTAMP:{stamp}\r\n"
+        "DTSTART" + dt_param + ":{s}\r\n"
+        "DTEND" + dt_param + ":{e}\r\n"
+        "SUMMARY:{sum}\r\n"
+        "{extras}END:VEVENT\r\n"
+    )
+
+
+# Per tzid: coda dell'header (X-WR-TIMEZONE + VTIMEZONE) e template VEVENT.
+# tzid=None → orari "floating" (DTSTART:...), senza blocco VTIMEZONE
+_HEADER_SUFFIXES = {
+    TZID: f"\r\nX-WR-TIMEZONE:{TZID}\r\n{VTIMEZONE_EUROPE_ROME}\r\n",
+    None: "\r\n",
+}
+_VEVENT_TMPLS = {
+    TZID: _vevent_tmpl(f";TZID={TZID}"),
+    None: _vevent_tmpl(""),
+}
+
+_VALARM_BLOCK_TMPL = (
+    "BEGIN:VALARM\r\n"
+    "TRIGGER:-PT{m}M\r\n"
+    "ACTION:DISPLAY\r\n"
+    "DESCRIPTION:Promemoria\r\n"
+    "END:VALARM\r\n"
+)
+# promemoria usati dagli agent (agent_mvp: 30, transport+lodging: 45)
+_ALARM_CACHE = {m: _VALARM_BLOCK_TMPL.format(m=m) for m in (30, 45)}
+
+
+def _emit_event(e: Event, uid: str, stamp: str, alarm: str, tmpl: str) -> str:
+    # scrittura lineare: i campi vuoti producono "" invece di blocchi if separati per campo
+    notes, url, loc = e.notes, e.url, e.location
+    desc = _escape_ics(notes) + ("\\n" if notes and url else "") + ("Link: " + _escape_ics(url) if url else "")
+    return tmpl.format_map(
+        {
+            "uid": f"{uid}@tripplanner",
+            "stamp": stamp,
+            "s": _fmt(e.start),
+            "e": _fmt(e.end),
+            "sum": _escape_ics(e.title),
+            "extras": ("LOCATION:" + _escape_ics(loc) + "\r\n" if loc else "")
+            + ("DESCRIPTION:" + desc + "\r\n" if desc else "")
+            + alarm,
+        }
+    )
+
+
+def iter_ics_lines(
+    title: str,
+    events: List[Event],
+    alarm_min: int = 30,
+    prodid: str = PRODID_MVP,
+    tzid: Optional[str] = TZID,
+) -> Iterator[str]:
+    # un blocco CRLF-terminato per volta (header, ogni VEVENT, footer): scrivibile in streaming
+    if tzid not in _VEVENT_TMPLS:
+        raise ValueError(f"VTIMEZONE non disponibile per {tzid!r}")
+    tmpl = _VEVENT_TMPLS[tzid]
+    now_utc = _dtstamp()
+    yield _HEADER_PREFIX + prodid + _HEADER_MID + _escape_ics(title) + _HEADER_SUFFIXES[tzid]
+
+    alarm = ""
+    if alarm_min and alarm_min > 0:
+        alarm_min = int(alarm_min)
+        alarm = _ALARM_CACHE.get(alarm_min) or _VALARM_BLOCK_TMPL.format(m=alarm_min)
+
+    uids = _uuid4_batch(len(events))
+    for e, uid in zip(events, uids):
+        yield _emit_event(e, uid, now_utc, alarm, tmpl)
+
+    yield "END:VCALENDAR\r\n"
+
+
+def make_ics(
+    title: str,
+    events: List[Event],
+    alarm_min: int = 30,
+    prodid: str = PRODID_MVP,
+    tzid: Optional[str] = TZID,
+) -> str:
+    return "".join(iter_ics_lines(title, events, alarm_min, prodid, tzid))
+
+
+# ==========================
+# Google Calendar link utils
+# ==========================
+
+def _q(s: str) -> str:
+    # equivalente a quote_plus, ma una sola codifica UTF-8 e fast path C per l'ASCII sicuro
+    return _qb(s.encode("utf-8"), b" ").replace(" ", "+")
+
+
+def gcal_link(e: Event) -> str:
+    base = "https://calendar.google.com/calendar/render?action=TEMPLATE"
+    # chiavi fisse: niente urlencode; le date sono solo cifre/T, "/" già codificato
+    return (
+        f"{base}&text={_q(e.title)}"
+        f"&dates={_fmt(e.start)}%2F{_fmt(e.end)}"
+        f"&details={_q(e.notes or '')}"
+        f"&location={_q(e.location or '')}"
+    )
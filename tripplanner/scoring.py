@@ -0,0 +1,131 @@
+"""
+TripPlanner — scoring condiviso delle opzioni (trasporto / alloggio)
+- score_transport / score_lodging: formule scalari di riferimento (pesi configurabili)
+- best_transport / best_lodging: opzione con punteggio massimo (pesi di default)
+
+NumPy è opzionale: con molte opzioni lo scoring è vettorizzato,
+e compilato con Numba se disponibile (import lazy, al primo uso).
+"""
+from __future__ import annotations
+from operator import attrgetter
+from typing import Callable, Dict, Sequence, TypeVar
+
+try:
+    import numpy as np
+except ImportError:  # stdlib-only: si usa lo scoring scalare
+    np = None
+
+T = TypeVar("T")
+
+
+def score_transport(price: float, duration_min: float, transfers: float,
+                    w_price: float = 0.55, w_time: float = 0.35, w_transfers: float = 0.10) -> float:
+    # prezzo/durata/transiti più bassi → punteggi ~ [0..1], normalizzati con cap ragionevoli
+    # (200 €, 7h, 2 transiti)
+    return (w_price * max(0.0, 1 - price / 200)
+            + w_time * max(0.0, 1 - duration_min / 420)
+            + w_transfers * max(0.0, 1 - transfers / 2))
+
+
+def score_lodging(rating: float, price_per_night: float, reviews_count: float,
+                  w_rating: float = 0.7, w_price: float = 0.3) -> float:
+    # rating alto e prezzo basso (cap 180 €) + bonus recensioni fino a 0.1
+    return (w_rating * (rating / 5.0)
+            + w_price * max(0.0, 1 - price_per_night / 180)
+            + min(0.1, (reviews_count / 2000) * 0.1))
+
+
+# sotto questa soglia il dispatch NumPy costa più del loop Python
+_VEC_MIN_OPTIONS = 8
+
+
+def _transport_vec(price, dur, tr):
+    # score_transport (pesi di default) su array paralleli
+    return (0.55 * np.maximum(0.0, 1 - price / 200)
+            + 0.35 * np.maximum(0.0, 1 - dur / 420)
+            + 0.10 * np.maximum(0.0, 1 - tr / 2))
+
+
+def _lodging_vec(rating, price, reviews):
+    # score_lodging (pesi di default) su array paralleli
+    return (0.7 * (rating / 5.0)
+            + 0.3 * np.maximum(0.0, 1 - price / 180)
+            + np.minimum(0.1, (reviews / 2000) * 0.1))
+
+
+# Kernel a loop esplicito per Numba: formule scritte inline, funzioni di modulo
+# (niente closure: la cache su disco di Numba resta valida tra un processo e l'altro)
+def _transport_argmax(price, dur, tr):
+    best_i, best_s = 0, -1.0
+    for i in range(price.shape[0]):
+        s = (0.55 * max(0.0, 1 - price[i] / 200)
+             + 0.35 * max(0.0, 1 - dur[i] / 420)
+             + 0.10 * max(0.0, 1 - tr[i] / 2))
+        if s > best_s:
+            best_i, best_s = i, s
+    return best_i
+
+
+def _lodging_argmax(rating, price, reviews):
+    best_i, best_s = 0, -1.0
+    for i in range(rating.shape[0]):
+        s = (0.7 * (rating[i] / 5.0)
+             + 0.3 * max(0.0, 1 - price[i] / 180)
+             + min(0.1, (reviews[i] / 2000) * 0.1))
+        if s > best_s:
+            best_i, best_s = i, s
+    return best_i
+
+
+_JIT_SIG = "int64(float32[:], float32[:], float32[:])"
+_KERNELS: Dict[Callable, Callable] = {}
+
+
+def _kernel(loop, vec) -> Callable:
+    # compila al primo uso (import di numba lazy: costa centinaia di ms all'avvio)
+    k = _KERNELS.get(loop)
+    if k is None:
+        try:
+            from numba import njit
+        except ImportError:
+            k = lambda a, b, c: int(vec(a, b, c).argmax())
+        else:
+            k = njit(_JIT_SIG, cache=True)(loop)
+        _KERNELS[loop] = k
+    return k
+
+
+def _pick_vec(options: Sequence[T], fields: tuple, loop, vec) -> T:
+    n = len(options)
+    cols = [np.fromiter(map(attrgetter(f), options), dtype=np.float32, count=n) for f in fields]
+    return options[_kernel(loop, vec)(*cols)]
+
+
+def best_transport(options: Sequence[T]) -> T:
+    # opzioni con price_eur / duration_min / transfers (non vuote)
+    if np is not None and len(options) >= _VEC_MIN_OPTIONS:
+        return _pick_vec(options, ("price_eur", "duration_min", "transfers"), _transport_argmax, _transport_vec)
+    # score_transport inlinato (pesi di default): niente chiamata di funzione per opzione
+    best, best_s = None, -1.0
+    for o in options:
+        s = (0.55 * max(0.0, 1 - o.price_eur / 200)
+             + 0.35 * max(0.0, 1 - o.duration_min / 420)
+             + 0.10 * max(0.0, 1 - o.transfers / 2))
+        if s > best_s:
+            best, best_s = o, s
+    return best
+
+
+def best_lodging(options: Sequence[T]) -> T:
+    # opzioni con rating / price_per_night_eur / reviews_count (non vuote)
+    if np is not None and len(options) >= _VEC_MIN_OPTIONS:
+        return _pick_vec(options, ("rating", "price_per_night_eur", "reviews_count"), _lodging_argmax, _lodging_vec)
+    # score_lodging inlinato (pesi di default)
+    best, best_s = None, -1.0
+    for o in options:
+        s = (0.7 * (o.rating / 5.0)
+             + 0.3 * max(0.0, 1 - o.price_per_night_eur / 180)
+             + min(0.1, (o.reviews_count / 2000) * 0.1))
+        if s > best_s:
+            best, best_s = o, s
+    return best